@@ -5,6 +5,8 @@ Orchestrates data collection, analysis, and visualisation for
 testing market efficiency hypotheses in BTC/USDT orderbook data.
 """
 
+import asyncio
+import os
 import sys
 from pathlib import Path
 
@@ -27,16 +29,23 @@ def run_pipeline(data_filepath: Path = None):
     
     # Determine data file
     if data_filepath is None:
-        data_dir = Path('data')
-        data_files = list(data_dir.glob('orderbook_BTC_USDT_*.csv'))
+        # Most recent file in one directory scan (entries cache their stat)
+        latest = None
+        if Path('data').is_dir():
+            with os.scandir('data') as entries:
+                latest = max(
+                    (e for e in entries
+                     if e.name.startswith('orderbook_BTC_USDT_') and e.name.endswith('.csv')),
+                    key=lambda e: e.stat().st_mtime,
+                    default=None
+                )
         
-        if not data_files:
+        if latest is None:
             print("\nNo data files found.")
             print("Please run collection first or specify a data file.")
             return 1
             
-        # Use most recent file
-        data_filepath = max(data_files, key=lambda p: p.stat().st_mtime)
+        data_filepath = Path(latest.path)
     
     print(f"\nUsing data file: {data_filepath.name}")
     
@@ -48,12 +57,15 @@ def run_pipeline(data_filepath: Path = None):
     df = analysis.load_and_prepare_data(data_filepath)
     print(f"Loaded {len(df)} orderbook snapshots")
     
+    # Log mid price shared by both hypothesis tests
+    log_mid = analysis.log_mid_price(df)
+
     # Test hypotheses
-    imbalance_results = analysis.test_imbalance_hypothesis(df)
+    imbalance_results = analysis.test_imbalance_hypothesis(df, log_mid=log_mid)
     analysis.save_results(imbalance_results, 'imbalance_hypothesis')
     print("Imbalance hypothesis tested")
     
-    efficiency_results = analysis.test_market_efficiency(df)
+    efficiency_results = analysis.test_market_efficiency(df, log_mid=log_mid)
     analysis.save_results(efficiency_results, 'market_efficiency')
     print("Market efficiency tested")
     
@@ -87,7 +99,7 @@ def run_pipeline(data_filepath: Path = None):
     print("=" * 60)
     
     best_horizon = imbalance_results['best_horizon']
-    best_corr = imbalance_results['correlations'][str(best_horizon)]
+    best_corr = imbalance_results['correlations'][best_horizon]
     
     print("Order Book Imbalance:")
     print(f"  • Peak correlation: {best_corr:.3f} at {best_horizon * 20}s")
@@ -103,6 +115,24 @@ def run_pipeline(data_filepath: Path = None):
     return 0
 
 
+async def _collect(duration_minutes: int, interval_seconds: int):
+    """Open the exchange, run collection and always close the connection."""
+    exchange = await collection.initialise_exchange('binance')
+    if exchange is None:
+        print("Failed to initialise exchange")
+        return None
+
+    try:
+        return await collection.collect_orderbook_data(
+            exchange, 
+            duration_minutes=duration_minutes,
+            interval_seconds=interval_seconds,
+            return_df=False
+        )
+    finally:
+        await exchange.close()
+
+
 def collect_new_data(duration_minutes: int = 60, interval_seconds: int = 20):
     """
     Collect fresh orderbook data from Binance.
@@ -112,22 +142,15 @@ def collect_new_data(duration_minutes: int = 60, interval_seconds: int = 20):
         How long to collect data
     interval_seconds : int
         Time between snapshots
+
+    Returns:
+    Path or None
+        Path to the saved CSV, or None if collection failed
     """
     print("\nCOLLECTING NEW DATA")
     print("-" * 40)
     
-    exchange = collection.initialise_exchange('binance')
-    if exchange is None:
-        print("Failed to initialise exchange")
-        return None
-        
-    df = collection.collect_orderbook_data(
-        exchange, 
-        duration_minutes=duration_minutes,
-        interval_seconds=interval_seconds
-    )
-    
-    return df
+    return asyncio.run(_collect(duration_minutes, interval_seconds))
 
 
 def main():
@@ -160,9 +183,9 @@ def main():
         elif choice == '3':
             duration = input("Duration in minutes (default 60): ")
             duration = int(duration) if duration else 60
-            df = collect_new_data(duration)
-            if df is not None:
-                run_pipeline()
+            data_filepath = collect_new_data(duration)
+            if data_filepath is not None:
+                run_pipeline(data_filepath)
         else:
             print("Invalid choice")
             return 1
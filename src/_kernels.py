@@ -0,0 +1,111 @@
+"""
+Numba kernels for the analysis hot paths.
+
+Each kernel works on plain NumPy arrays in a single linear scan, so
+pandas stays off the per-horizon / per-threshold loops. Compiled on
+first call and cached to disk.
+"""
+
+import numpy as np
+from numba import njit, prange
+
+
+# fastmath without 'nnan'/'ninf' so the NaN checks below are kept
+_FASTMATH = {'nsz', 'arcp', 'contract', 'reassoc'}
+
+
+@njit(cache=True, parallel=True, fastmath=_FASTMATH)
+def imbalance_correlations(imbalance: np.ndarray, log_price: np.ndarray, horizons: np.ndarray) -> np.ndarray:
+    """
+    Correlation between imbalance and forward log returns at each horizon
+
+    Parameters:
+    imbalance : np.ndarray
+        Order book imbalance at each snapshot
+    log_price : np.ndarray
+        Log mid price at each snapshot (same length as imbalance)
+    horizons : np.ndarray
+        Forward-looking periods (int64), processed in parallel
+
+    Returns:
+    np.ndarray
+        Pearson correlation per horizon between imbalance[t] and
+        log_price[t+h] - log_price[t]. Pairs with a NaN are skipped;
+        NaN where fewer than two pairs remain or either side is constant
+    """
+    n = imbalance.size
+    corrs = np.empty(horizons.size)
+
+    for i in prange(horizons.size):
+        h = horizons[i]
+        count = 0
+        sum_x = 0.0
+        sum_y = 0.0
+        sum_xx = 0.0
+        sum_yy = 0.0
+        sum_xy = 0.0
+
+        for t in range(n - h):
+            x = imbalance[t]
+            y = log_price[t + h] - log_price[t]
+            if np.isnan(x) or np.isnan(y):
+                continue
+            count += 1
+            sum_x += x
+            sum_y += y
+            sum_xx += x * x
+            sum_yy += y * y
+            sum_xy += x * y
+
+        corrs[i] = np.nan
+        if count >= 2:
+            cov = sum_xy - sum_x * sum_y / count
+            var_x = sum_xx - sum_x * sum_x / count
+            var_y = sum_yy - sum_y * sum_y / count
+            if var_x > 0.0 and var_y > 0.0:
+                corrs[i] = cov / np.sqrt(var_x * var_y)
+
+    return corrs
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def directional_accuracy(imbalance: np.ndarray, log_price: np.ndarray, horizon: int, thresholds: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Directional hit counts of imbalance against forward log returns
+
+    Parameters:
+    imbalance : np.ndarray
+        Order book imbalance at each snapshot
+    log_price : np.ndarray
+        Log mid price at each snapshot (same length as imbalance)
+    horizon : int
+        Forward-looking period for the return
+    thresholds : np.ndarray
+        Absolute imbalance thresholds, all counted in the same scan
+
+    Returns:
+    tuple[np.ndarray, np.ndarray]
+        (counts, correct) per threshold: number of valid periods with
+        |imbalance| > threshold, and how many of those had
+        sign(imbalance) == sign(return)
+    """
+    counts = np.zeros(thresholds.size, dtype=np.int64)
+    correct = np.zeros(thresholds.size, dtype=np.int64)
+
+    for t in range(imbalance.size - horizon):
+        x = imbalance[t]
+        y = log_price[t + horizon] - log_price[t]
+        if np.isnan(x) or np.isnan(y):
+            continue
+
+        # Compare IEEE sign bits directly; a zero return never counts as a hit
+        # (|x| > threshold already rules out zero imbalance)
+        abs_x = abs(x)
+        hit = y != 0.0 and np.signbit(x) == np.signbit(y)
+        for j in range(thresholds.size):
+            if abs_x > thresholds[j]:
+                counts[j] += 1
+                if hit:
+                    correct[j] += 1
+
+    return counts, correct
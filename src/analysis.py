@@ -12,6 +12,13 @@ import numpy as np
 import json
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:  # optional, falls back to stdlib json
+    orjson = None
+
+from ._kernels import imbalance_correlations, directional_accuracy
+
 
 # Data preparation functions
 def load_and_prepare_data(filepath: Path) -> pd.DataFrame:
@@ -27,18 +34,74 @@ def load_and_prepare_data(filepath: Path) -> pd.DataFrame:
         Cleaned DataFrame ready for analysis
     """
 
-    df = pd.read_csv(filepath)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df = df.set_index('timestamp')
-
     # columns to keep for testing my specific hypotheses
     columns_to_keep = ['spread_bps', 'mid_price', 'imbalance_5', 'spread', 'best_bid', 'best_ask']
-    df = df[columns_to_keep].apply(pd.to_numeric, errors = 'coerce')
+
+    # Read only the needed columns with explicit dtypes (no object intermediates)
+    df = pd.read_csv(
+        filepath,
+        usecols=['timestamp'] + columns_to_keep,
+        dtype={c: 'float64' for c in columns_to_keep},
+        parse_dates=['timestamp'],
+        engine='pyarrow',
+    ).set_index('timestamp')
 
     return df
 
 
-def test_imbalance_hypothesis(df, horizons: list[int] = list(range(1,31)), thresholds: list[float] = [0.3, 0.5, 0.7]) -> dict:
+def _autocorrelations(x: np.ndarray, max_lag: int) -> np.ndarray:
+    """
+    Sample autocorrelations rho_0..rho_max_lag of x
+
+    Uses the FFT of the zero-padded, demeaned series (O(n log n) for all
+    lags at once). NaNs are zero-filled after demeaning, so a gap adds
+    nothing to any lag product and the lags on either side stay aligned
+    in time. Entries beyond the series length, or for a series with
+    fewer than two valid values or no variation, are NaN
+    """
+    acf = np.full(max_lag + 1, np.nan)
+    n = x.size
+    valid = ~np.isnan(x)
+    if valid.sum() < 2:
+        return acf
+
+    x = np.where(valid, x - x[valid].mean(), 0.0)
+    nfft = 1 << (2 * n - 1).bit_length()  # padding avoids circular wrap-around
+    spectrum = np.fft.rfft(x, nfft)
+    acov = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, nfft)
+
+    m = min(max_lag, n - 1) + 1
+    if acov[0] > 0:
+        acf[:m] = acov[:m] / acov[0]
+    return acf
+
+
+def log_mid_price(df: pd.DataFrame) -> np.ndarray:
+    """
+    Log of the 'mid_price' column as a float64 array
+
+    Compute once per dataset and pass to both hypothesis tests as `log_mid`
+    """
+    return np.log(df['mid_price'].to_numpy(dtype=np.float64))
+
+
+def _resolve_log_mid(df: pd.DataFrame, log_mid: np.ndarray | None) -> np.ndarray:
+    """
+    Compute log_mid from df, or validate a caller-supplied array
+
+    The kernels index it unchecked alongside df's columns, so its length
+    must match df exactly
+    """
+    if log_mid is None:
+        return log_mid_price(df)
+
+    log_mid = np.asarray(log_mid, dtype=np.float64)
+    if log_mid.shape != (len(df),):
+        raise ValueError(f"log_mid must have shape ({len(df)},), got {log_mid.shape}")
+    return log_mid
+
+
+def test_imbalance_hypothesis(df, horizons: list[int] = list(range(1,31)), thresholds: list[float] = [0.3, 0.5, 0.7], *, log_mid: np.ndarray = None) -> dict:
     """
     Test relationship between order book imbalance and future price movements
     
@@ -56,6 +119,9 @@ def test_imbalance_hypothesis(df, horizons: list[int] = list(range(1,31)), thres
         Absolute imbalance thresholds for directional accuracy test
         Tests only periods where |imbalance| exceeds threshold
         Values should be between 0 and 1 inclusive
+    log_mid : np.ndarray, optional, keyword-only
+        Precomputed log_mid_price(df), shared with test_market_efficiency.
+        Computed from df if None; must have one value per row of df
     
     Returns:
     dict
@@ -71,6 +137,7 @@ def test_imbalance_hypothesis(df, horizons: list[int] = list(range(1,31)), thres
     Notes:
     Uses the best-correlated horizon for directional accuracy testing
     Positive imbalance indicates more bid volume 
+    Returns are kept as local arrays; df is not modified
     """
 
     if 'mid_price' not in df.columns or 'imbalance_5' not in df.columns:
@@ -78,36 +145,33 @@ def test_imbalance_hypothesis(df, horizons: list[int] = list(range(1,31)), thres
 
     results = {}
     
-    # Test correlation at different horizons
-    correlations = {}
-    for horizon in horizons:
-        returns = df['mid_price'].pct_change(periods=horizon).shift(-horizon)
-        corr = float(df['imbalance_5'].corr(returns))
-        correlations[horizon] = corr
+    # Kernels form forward returns on the fly from the log mid price
+    imbalance = df['imbalance_5'].to_numpy(dtype=np.float64)
+    log_mid = _resolve_log_mid(df, log_mid)
+
+    # Test correlation at different horizons (one fused pass per horizon)
+    corrs = imbalance_correlations(imbalance, log_mid, np.asarray(horizons, dtype=np.int64))
+    correlations = dict(zip(horizons, corrs.tolist()))
     
     results['correlations'] = correlations
-    results['best_horizon'] = max(correlations, key=correlations.get)
+    # Strongest relationship in either direction (a negative correlation is as informative)
+    best_h = max(correlations, key=lambda h: abs(correlations[h]))
+    results['best_horizon'] = best_h
     
     # Test directional accuracy (using best horizon)
-    best_h = results['best_horizon']
-    df['returns'] = df['mid_price'].pct_change(periods=best_h).shift(-best_h)
+    counts, correct = directional_accuracy(imbalance, log_mid, best_h, np.asarray(thresholds, dtype=np.float64))
     
     accuracies = {}
-    for threshold in thresholds:
-        strong_imbalance = abs(df['imbalance_5']) > threshold
-        subset = df[strong_imbalance].dropna()
-        
-        if len(subset) > 0:
-            correct = (np.sign(subset['imbalance_5']) == np.sign(subset['returns'])).sum()
-            accuracy = float(correct / len(subset))
-            accuracies[threshold] = accuracy
+    for threshold, n, hits in zip(thresholds, counts.tolist(), correct.tolist()):
+        if n > 0:
+            accuracies[threshold] = hits / n
     
     results['directional_accuracy'] = accuracies
     
     return results
  
 
-def test_market_efficiency(df: pd.DataFrame, lags: list[int] = [2, 5, 7, 10, 15, 20, 25, 30]) -> dict:
+def test_market_efficiency(df: pd.DataFrame, lags: list[int] = [2, 5, 7, 10, 15, 20, 25, 30], *, log_mid: np.ndarray = None) -> dict:
     """
     Variance ratio test for market efficiency 
     
@@ -120,6 +184,9 @@ def test_market_efficiency(df: pd.DataFrame, lags: list[int] = [2, 5, 7, 10, 15,
         Data with 'mid_price' column
     lags : list, default=[2, 5, 10, 20]
         Periods to test (k-period returns vs 1-period)
+    log_mid : np.ndarray, optional, keyword-only
+        Precomputed log_mid_price(df), shared with test_imbalance_hypothesis.
+        Computed from df if None; must have one value per row of df
         
     Returns:
     dict
@@ -129,6 +196,13 @@ def test_market_efficiency(df: pd.DataFrame, lags: list[int] = [2, 5, 7, 10, 15,
         
     Notes:
     VR(k) = Var(k-period return) / (k * Var(1-period return))
+    estimated from the autocorrelations of 1-period returns as
+    VR(k) = 1 + 2 * sum_{i=1}^{k-1} (1 - i/k) * rho_i
+    The two forms agree only asymptotically; on finite samples this
+    estimate differs from the direct variance ratio in the third decimal
+    (e.g. VR(2) 0.911 vs 0.909 on the bundled data)
+    Returns next to a missing price are treated as gaps (zero-filled
+    after demeaning), so autocorrelations are not taken across them
     VR = 1: Random walk (efficient)
     VR < 1: Mean reversion
     VR > 1: Trending/momentum
@@ -137,24 +211,18 @@ def test_market_efficiency(df: pd.DataFrame, lags: list[int] = [2, 5, 7, 10, 15,
     # initialise results dictionary
     variance_ratios = {}
 
-    # Calculating 1 period log returns. removing NaNs
-    log_returns = np.log(df['mid_price'] / df['mid_price'].shift(1))
-    log_returns = log_returns.dropna()
+    log_mid = _resolve_log_mid(df, log_mid)
 
-    variance = log_returns.var()
+    # 1 period log returns, NaNs kept in place so lags stay aligned across gaps
+    log_returns = np.diff(log_mid)
 
-    # For each lag, calculate k-period returns and variance ratio
+    # Autocorrelations up to the largest lag, from one FFT pass
+    acf = _autocorrelations(log_returns, max(lags) - 1)
+
+    # For each lag, VR(k) = 1 + 2 * sum_{i<k} (1 - i/k) * rho_i
     for k in lags:
-        # Calculate k-period returns (NOT summing)
-        log_returns_k = np.log(df['mid_price'] / df['mid_price'].shift(k))
-        log_returns_k = log_returns_k.dropna()
-        
-        # Calculate variance of k-period returns
-        var_k = log_returns_k.var()
-        
-        # Calculate variance ratio
-        var_ratio = float(var_k / (k * variance))
-        variance_ratios[k] = var_ratio
+        weights = 1 - np.arange(1, k) / k
+        variance_ratios[k] = float(1 + 2 * np.dot(weights, acf[1:k]))
 
     
     avg_vr = np.mean(list(variance_ratios.values()))
@@ -175,10 +243,24 @@ def test_market_efficiency(df: pd.DataFrame, lags: list[int] = [2, 5, 7, 10, 15,
     return vr_results
     
 
+def _nan_to_none(obj):
+    """Recursively replace NaN floats with None in nested dicts/lists"""
+    if isinstance(obj, dict):
+        return {k: _nan_to_none(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_nan_to_none(v) for v in obj]
+    if isinstance(obj, float) and np.isnan(obj):
+        return None
+    return obj
+
+
 def save_results(results: dict, analysis_name: str):
     """
     Save analysis results to json file.
-    
+
+    Uses orjson when installed (NumPy values serialised natively),
+    otherwise the stdlib json encoder. Either way NaN values (e.g. an
+    undefined correlation) are written as null, so the file is valid JSON.
     """
 
     results_dir = Path('results') / 'metrics'
@@ -186,8 +268,15 @@ def save_results(results: dict, analysis_name: str):
     results_dir.mkdir(parents=True, exist_ok=True)
     
     filepath = results_dir / f'{analysis_name}_results.json'
-    with open(filepath, 'w') as f:
-        json.dump(results, f, indent=2)
+    if orjson is not None:
+        # int/float dict keys (horizons, thresholds, lags) need OPT_NON_STR_KEYS
+        options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_INDENT_2
+        with open(filepath, 'wb') as f:
+            f.write(orjson.dumps(results, option=options))
+    else:
+        # stdlib json would write bare NaN; match orjson's null instead
+        with open(filepath, 'w') as f:
+            json.dump(_nan_to_none(results), f, indent=2, allow_nan=False)
     
     print(f"Results saved to {filepath}")
 
@@ -3,17 +3,69 @@ Collection of data functions for cryptocurrency orderbook snapshots.
 
 Functions for connecting to exchanges via CCXT, fetching orderbook data,
 and collecting time series of market microstructure data.
+
+Exchange I/O uses ccxt's asyncio API, so the collection functions are
+coroutines and need to run inside an event loop (e.g. asyncio.run).
 """
 
-import ccxt
+import asyncio
+import ccxt.async_support as ccxt
+import csv
+import numpy as np
 import pandas as pd
-import time
-from datetime import datetime, timedelta
+from dataclasses import dataclass, fields
+from datetime import datetime, timedelta, timezone
+from operator import attrgetter
+from pathlib import Path
+
+
+@dataclass(frozen=True, slots=True)
+class Snapshot:
+    """
+    A single orderbook snapshot
+
+    Field order matches the collection CSV columns. Depth and derived
+    metrics are None when the book is too thin to compute them.
+    """
+    timestamp: int  # epoch milliseconds
+    datetime: str
+    symbol: str
+
+    best_bid: float | None
+    best_ask: float | None
+    best_bid_size: float | None
+    best_ask_size: float | None
+
+    bid_depth_5: float | None
+    ask_depth_5: float | None
+    bid_depth_10: float | None
+    ask_depth_10: float | None
+
+    spread: float | None
+    spread_bps: float | None
+    mid_price: float | None
+    imbalance_5: float | None
+
+    # Full orderbook depth, only attached on request and never written to CSV
+    bids: list | None = None  # List of [price, size] pairs
+    asks: list | None = None
+
 
+# Columns written to the collection CSV (full depth lists are never stored)
+CSV_FIELDS = tuple(f.name for f in fields(Snapshot) if f.name not in ('bids', 'asks'))
 
-def initialise_exchange(exchange_id: str = 'binance') -> ccxt.Exchange:
+# CSV values after the timestamp, read straight off the slots
+_csv_values = attrgetter(*CSV_FIELDS[1:])
+
+# Flush the CSV to disk every N snapshots so a crash loses little data
+FLUSH_EVERY = 10
+
+
+async def initialise_exchange(exchange_id: str = 'binance') -> ccxt.Exchange:
     """
-    Initialize and return exchange object
+    Initialize and return async exchange object
+
+    The caller owns the exchange and must `await exchange.close()` when done.
 
     Args:
         exchange_id: Name of exchange (default 'binance')
@@ -22,20 +74,34 @@ def initialise_exchange(exchange_id: str = 'binance') -> ccxt.Exchange:
         ccxt.Exchange object
     """
 
+    exchange = None
     try:
 
         exchange_class = getattr(ccxt, exchange_id)
         exchange: ccxt.Exchange = exchange_class()
-        exchange.load_markets()
+        await exchange.load_markets()
         exchange.enableRateLimit = True
         return exchange
 
     except Exception as e:
         print(f"Error: {e}")
+        if exchange is not None:
+            await exchange.close()
         return None
 
 
-def fetch_orderbook_snapshot(exchange: ccxt.Exchange, symbol: str = 'BTC/USDT', depth: int = 20) -> dict:
+def _cumulative_depth(levels: list) -> np.ndarray:
+    """
+    Running total of size down a ccxt [[price, size], ...] level list
+
+    ccxt returns levels best-first, so element N-1 is the depth of the top N levels
+    """
+    if not levels:
+        return np.empty(0)
+    return np.cumsum(np.asarray(levels, dtype=np.float64)[:, 1])
+
+
+async def fetch_orderbook_snapshot(exchange: ccxt.Exchange, symbol: str = 'BTC/USDT', depth: int = 20, keep_depth: bool = False, timeout: float = None) -> Snapshot:
     """
     Fetch a single orderbook snapshot with error handling
 
@@ -43,61 +109,94 @@ def fetch_orderbook_snapshot(exchange: ccxt.Exchange, symbol: str = 'BTC/USDT',
         exchange (str): exchange str to be converted to ccxt object
         symbol (str, optional): symbol for orderbook snapshot. Defaults to 'BTC/USDT'.
         depth (int, optional): how deep to go in orderbook. Defaults to 20.
+        keep_depth (bool, optional): attach the full 'bids'/'asks' level lists. Defaults to False.
+        timeout (float, optional): give up on the request after this many seconds. Defaults to None (no limit).
     """
     try: 
-        orderbook = exchange.fetch_order_book(symbol, limit = depth)
+        orderbook = await asyncio.wait_for(exchange.fetch_order_book(symbol, limit = depth), timeout)
 
         snapshot_time = datetime.now()
+        bids, asks = orderbook['bids'], orderbook['asks']
 
-        snapshot: dict =  {
-            'timestamp': int(snapshot_time.timestamp() * 1000),
-            'datetime' : snapshot_time.isoformat(),
-            'symbol': symbol,
-
-            'best_bid': orderbook['bids'][0][0] if orderbook['bids'] else None,
-            'best_ask': orderbook['asks'][0][0] if orderbook['asks'] else None,
-            'best_bid_size': orderbook['bids'][0][1] if orderbook['bids'] else None,
-            'best_ask_size': orderbook['asks'][0][1] if orderbook['asks'] else None,
-
-            # Store full orderbook depth (for later analysis)
-            'bids': orderbook['bids'][:depth],  # List of [price, size] pairs
-            'asks': orderbook['asks'][:depth],
-
-            # Calculate aggregate metrics
-            'bid_depth_5': sum([bid[1] for bid in orderbook['bids'][:5]]) if len(orderbook['bids']) >= 5 else None,
-            'ask_depth_5': sum([ask[1] for ask in orderbook['asks'][:5]]) if len(orderbook['asks']) >= 5 else None,
-            'bid_depth_10': sum([bid[1] for bid in orderbook['bids'][:10]]) if len(orderbook['bids']) >= 10 else None,
-            'ask_depth_10': sum([ask[1] for ask in orderbook['asks'][:10]]) if len(orderbook['asks']) >= 10 else None,
-        }
-       
-       # Calculate derived metrics
-        if snapshot['best_bid'] and snapshot['best_ask']:
-            snapshot['spread'] = snapshot['best_ask'] - snapshot['best_bid']
-            snapshot['spread_bps'] = (snapshot['spread'] / snapshot['best_bid']) * 10000  # Basis points
-            snapshot['mid_price'] = (snapshot['best_bid'] + snapshot['best_ask']) / 2
+        best_bid = bids[0][0] if bids else None
+        best_ask = asks[0][0] if asks else None
 
-            # Order book imbalance
-            if snapshot['bid_depth_5'] and snapshot['ask_depth_5']:
-                total_depth = snapshot['bid_depth_5'] + snapshot['ask_depth_5']
-                snapshot['imbalance_5'] = (snapshot['bid_depth_5'] - snapshot['ask_depth_5']) / total_depth
+        # Cumulative sizes computed once, any depth-N aggregate is then a single lookup
+        bid_cum = _cumulative_depth(bids)
+        ask_cum = _cumulative_depth(asks)
+
+        # Calculate aggregate metrics
+        bid_depth_5 = float(bid_cum[4]) if bid_cum.size >= 5 else None
+        ask_depth_5 = float(ask_cum[4]) if ask_cum.size >= 5 else None
 
+        # Calculate derived metrics
+        spread = spread_bps = mid_price = imbalance_5 = None
+        if best_bid and best_ask:
+            spread = best_ask - best_bid
+            spread_bps = (spread / best_bid) * 10000  # Basis points
+            mid_price = (best_bid + best_ask) / 2
 
-        return snapshot
+            # Order book imbalance
+            if bid_depth_5 and ask_depth_5:
+                imbalance_5 = (bid_depth_5 - ask_depth_5) / (bid_depth_5 + ask_depth_5)
+
+        return Snapshot(
+            timestamp=int(snapshot_time.timestamp() * 1000),
+            datetime=snapshot_time.isoformat(),
+            symbol=symbol,
+
+            best_bid=best_bid,
+            best_ask=best_ask,
+            best_bid_size=bids[0][1] if bids else None,
+            best_ask_size=asks[0][1] if asks else None,
+
+            bid_depth_5=bid_depth_5,
+            ask_depth_5=ask_depth_5,
+            bid_depth_10=float(bid_cum[9]) if bid_cum.size >= 10 else None,
+            ask_depth_10=float(ask_cum[9]) if ask_cum.size >= 10 else None,
+
+            spread=spread,
+            spread_bps=spread_bps,
+            mid_price=mid_price,
+            imbalance_5=imbalance_5,
+
+            # Store full orderbook depth only when asked (not needed for the analysis)
+            bids=bids[:depth] if keep_depth else None,
+            asks=asks[:depth] if keep_depth else None,
+        )
+
+    except asyncio.TimeoutError:
+        print(f"Error fetching orderbook: no response within {timeout}s")
+        return None
 
     except Exception as e:
         print(f"Error fetching orderbook: {e}")
         return None
 
 
-def collect_orderbook_data(exchange: ccxt.Exchange, duration_minutes = 5, interval_seconds = 10, symbol = 'BTC/USDT') -> pd.DataFrame:
+def _utc_timestamp_str(timestamp_ms: int) -> str:
+    """Format epoch milliseconds as a naive UTC timestamp string (as pandas writes it)"""
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+
+
+async def collect_orderbook_data(exchange: ccxt.Exchange, duration_minutes = 5, interval_seconds = 10, symbol = 'BTC/USDT', return_df: bool = True) -> pd.DataFrame | Path:
     """
     Collect orderbook snapshots over specified duration
 
+    Snapshots are streamed to the CSV as they arrive, so memory stays flat
+    and a crash mid-collection keeps everything written so far.
+
+    Each fetch is started on schedule as a task (bounded by the interval) and
+    the previous snapshot is processed while it is in flight, so request
+    latency does not push back the next target time.
+
     Args:
         exchange (ccxt.Exchange): exchange object
         duration_minutes (int, optional): Duration for taking snapshots. Defaults to 5.
         interval_seconds (int, optional): time interval between snapshots. Defaults to 10.
         symbol (str): trading pair for snapshots
+        return_df (bool, optional): re-read the saved CSV and return it as a DataFrame,
+            otherwise return the CSV path. Defaults to True.
     """
 
     print("\n" + "=" * 50)
@@ -109,83 +208,97 @@ def collect_orderbook_data(exchange: ccxt.Exchange, duration_minutes = 5, interv
     print(f"Expected snapshots: ~{duration_minutes * 60 // interval_seconds}")
     print("=" * 50 + "\n")
 
-    # Storage for snapshots
-    snapshots = []
-
     # Calculate end time
     start_time = datetime.now()
     end_time = start_time + timedelta(minutes = duration_minutes)
 
+    # Output file, written row by row during collection
+    timestamp_str = start_time.strftime("%Y%m%d_%H%M%S")
+    filepath = Path('data') / f"orderbook_{symbol.replace('/', '_')}_{timestamp_str}.csv"
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+
     # Collection Loop
     snapshot_count = 0
     errors = 0
 
-    # set first target time
-    next_target = time.time()
-
-    while datetime.now() < end_time:
-        # Track when iteration starts
-        now = time.time()
-        wait_time = next_target - now
-
-        if wait_time > 0:
-            time.sleep(wait_time)
-        elif wait_time < -1:
-            print(f"[WARNING] Running {-wait_time:.1f}s behind schedule")
-        # Fetch snapshot
-        snapshot = fetch_orderbook_snapshot(exchange, symbol=symbol)
-
-        if snapshot:
-            snapshots.append(snapshot)
-            snapshot_count += 1
-            
-            elapsed = (datetime.now() - start_time).total_seconds()
-            remaining = (end_time - datetime.now()).total_seconds()
-
-            print(f"[{snapshot_count:4d}] {datetime.now().strftime('%H:%M:%S')} | "
-                  f"Spread: {snapshot.get('spread_bps', 0):5f} bps | "
-                  f"Mid: ${snapshot.get('mid_price', 0):5f} | "
-                  f"Imbalance: {snapshot.get('imbalance_5', 0):+.3f} | "
-                  f"Elapsed: {elapsed: 0f}s | "
-                  f"Remaining: {remaining:.0f}s")
-        
+    loop = asyncio.get_running_loop()
 
-        else:
-            errors += 1
-            print(f"[ERROR] Failed to fetch snapshot (total errors: {errors})")
+    with open(filepath, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS)
 
-        next_target += interval_seconds
-        
+        def record(snapshot: Snapshot | None) -> None:
+            """Write a fetched snapshot to the CSV and log progress"""
+            nonlocal snapshot_count, errors
+
+            if snapshot:
+                writer.writerow((_utc_timestamp_str(snapshot.timestamp), *_csv_values(snapshot)))
+                snapshot_count += 1
+                if snapshot_count % FLUSH_EVERY == 0:
+                    f.flush()
 
-    # Save collected data
-    if snapshots:
-        df = pd.DataFrame(snapshots)
+                elapsed = (datetime.now() - start_time).total_seconds()
+                remaining = (end_time - datetime.now()).total_seconds()
 
-        # Drop the nested lists (as not needed for the analysis)
-        df = df.drop(columns=['bids', 'asks'], errors='ignore')
-        #set timestamp as index
-        df['timestamp'] = pd.to_datetime(df['timestamp'], unit = 'ms')
-        df = df.set_index('timestamp')
+                print(f"[{snapshot_count:4d}] {datetime.now().strftime('%H:%M:%S')} | "
+                      f"Spread: {snapshot.spread_bps or 0:5f} bps | "
+                      f"Mid: ${snapshot.mid_price or 0:5f} | "
+                      f"Imbalance: {snapshot.imbalance_5 or 0:+.3f} | "
+                      f"Elapsed: {elapsed: 0f}s | "
+                      f"Remaining: {remaining:.0f}s")
 
-        # Save to CSV
-        timestamp_str = start_time.strftime("%Y%m%d_%H%M%S")
-        filename = f"data/orderbook_{symbol.replace('/', '_')}_{timestamp_str}.csv"
-        df.to_csv(filename)
 
+            else:
+                errors += 1
+                print(f"[ERROR] Failed to fetch snapshot (total errors: {errors})")
 
+        # set first target time (on the event loop clock)
+        next_target = loop.time()
+        pending = None
+
+        while datetime.now() < end_time:
+            # Track when iteration starts
+            wait_time = next_target - loop.time()
+
+            if wait_time > 0:
+                await asyncio.sleep(wait_time)
+            elif wait_time < -1:
+                print(f"[WARNING] Running {-wait_time:.1f}s behind schedule")
+
+            # Start this tick's fetch, then process the previous snapshot while it runs
+            fetch = asyncio.create_task(
+                fetch_orderbook_snapshot(exchange, symbol=symbol, timeout=interval_seconds)
+            )
+            if pending is not None:
+                record(await pending)
+            pending = fetch
+
+            next_target += interval_seconds
+
+        if pending is not None:
+            record(await pending)
+
+
+    if snapshot_count:
         print("\n" + "=" * 50)
         print("COLLECTION COMPLETE")
         print("=" * 50)
         print(f"Total snapshots: {snapshot_count}")
         print(f"Errors: {errors}")
         print(f"Success rate: {(snapshot_count/(snapshot_count+errors)*100 if snapshot_count+errors > 0 else 0):.1f}%")
-        print(f"Data saved to: {filename}")
-        print(f"Data shape: {df.shape}")
+        print(f"Data saved to: {filepath}")
         print("=" * 50)
 
+        if not return_df:
+            return filepath
+
+        # Re-read the saved file only when the caller needs the DataFrame
+        df = pd.read_csv(filepath, parse_dates=['timestamp'], index_col='timestamp')
+        print(f"Data shape: {df.shape}")
         return df
         
     else:
+        # Don't leave a header-only file behind
+        filepath.unlink(missing_ok=True)
         print("No snapshots collected!")
         return None
-
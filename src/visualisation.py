@@ -12,6 +12,30 @@ from pathlib import Path
 from typing import Dict
 import json
 
+from .analysis import load_and_prepare_data
+
+
+# Figures and their updatable artists, reused across calls (see _cached_figure)
+_fig_cache = {}
+
+
+def _cached_figure(name: str, build, n_bars: int, rebuild: bool) -> dict:
+    """
+    Return cached figure artists for `name`, building them if needed
+
+    Rebuilds when asked, when the figure has been closed, or when the
+    number of bars no longer matches the cached BarContainer
+    """
+    cached = _fig_cache.get(name)
+    if (rebuild or cached is None
+            or not plt.fignum_exists(cached['fig'].number)
+            or len(cached['bars']) != n_bars):
+        if cached is not None:
+            plt.close(cached['fig'])
+        cached = build(n_bars)
+        _fig_cache[name] = cached
+    return cached
+
 
 def load_data_and_results(data_filepath: Path) -> tuple[pd.DataFrame, dict, dict]:
     """
@@ -23,14 +47,12 @@ def load_data_and_results(data_filepath: Path) -> tuple[pd.DataFrame, dict, dict
         
     Returns:
     tuple containing:
-        - df: DataFrame with orderbook data
+        - df: DataFrame with the analysis columns of the orderbook data
         - imbalance_results: Dictionary with imbalance hypothesis results
         - efficiency_results: Dictionary with efficiency results
     """
-    # Load CSV data
-    df = pd.read_csv(data_filepath)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df = df.set_index('timestamp')
+    # Load CSV data with the analysis loader (typed columns, no inference pass)
+    df = load_and_prepare_data(data_filepath)
     
     # Load JSON results
     results_dir = Path('results') / 'metrics'
@@ -60,10 +82,49 @@ def setup_plot_style() -> None:
     plt.rcParams['grid.linestyle'] = '-'         
 
 
-def plot_imbalance_analysis(df: pd.DataFrame, imbalance_results: Dict, save_path: Path = None, show: bool = True) -> plt.Figure:
+def _build_imbalance_figure(n_thresholds: int) -> dict:
+    """
+    Create the imbalance figure with static decorations and empty artists
+    """
+    fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(18, 6))
+
+    # Left: Scatter plot of imbalance vs returns at best horizon
+    scatter = ax1.scatter([], [])
+    fit_line, = ax1.plot([], [], color='red', linewidth=2)
+    ax1.set_xlabel('Imbalance')
+    ax1.set_ylabel('Returns (%)')
+    ax1.grid(True, alpha=0.3)
+
+    # Middle: Correlation decay over different horizons
+    decay_line, = ax2.plot([], [], 'o-', markersize=5, linewidth=2)
+    ax2.set_xlabel('Time Horizon (minutes)')
+    ax2.set_ylabel('Correlation')
+    ax2.set_title('Correlation Decay Over Time')
+    ax2.axhline(y=0, color='black', linestyle='--', alpha=0.3)  # Reference line at 0
+    ax2.set_ylim(-0.05, 0.2)  # Focus on relevant range
+
+    # Right: Directional accuracy bar chart
+    bars = ax3.bar(range(n_thresholds), np.zeros(n_thresholds))
+    ax3.axhline(y=50, color='black', linestyle='--', alpha=0.5, label='Random (50%)')
+    ax3.set_xlabel('Imbalance Threshold')
+    ax3.set_ylabel('Directional Accuracy (%)')
+    ax3.set_title('Prediction Accuracy at Different Thresholds')
+    ax3.set_ylim(40, 60)  # Focus on relevant range around 50%
+    ax3.legend()
+
+    plt.tight_layout()
+
+    return {'fig': fig, 'axes': (ax1, ax2, ax3), 'scatter': scatter,
+            'fit_line': fit_line, 'decay_line': decay_line, 'bars': bars}
+
+
+def plot_imbalance_analysis(df: pd.DataFrame, imbalance_results: Dict, save_path: Path = None, show: bool = True, rebuild: bool = False) -> plt.Figure:
     """
     Visualise imbalance hypothesis results with scatter and correlation decay
     
+    The figure is built once and cached; later calls only update the
+    plotted data.
+
     Parameters:
     df : pd.DataFrame
         Orderbook data with 'imbalance_5' and 'mid_price' columns
@@ -71,89 +132,94 @@ def plot_imbalance_analysis(df: pd.DataFrame, imbalance_results: Dict, save_path
         Results from test_imbalance_hypothesis() containing correlations and best_horizon
     save_path : Path, optional
         If provided, saves figure to this location
+    rebuild : bool, default=False
+        Discard the cached figure and build a new one
         
     Returns:
     plt.Figure
-        Figure with two subplots showing imbalance analysis
+        Figure with three subplots showing imbalance analysis
     """
-    fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(18, 6))
+    accuracies = imbalance_results['directional_accuracy']
+    thresholds = list(map(float, accuracies.keys()))
+
+    cached = _cached_figure('imbalance', _build_imbalance_figure, len(thresholds), rebuild)
+    fig = cached['fig']
+    ax1, ax2, ax3 = cached['axes']
     
-    # Left: Scatter plot of imbalance vs returns at best horizon
-    # Right: Correlation decay over different horizons
     best_horizon = imbalance_results['best_horizon']
-    returns = df['mid_price'].pct_change(periods=best_horizon).shift(-best_horizon)
+    # Forward log returns, as correlated in test_imbalance_hypothesis()
+    returns = np.log(df['mid_price']).diff(best_horizon).shift(-best_horizon)
+
+    # Keys are ints in memory, strings once loaded back from JSON
+    correlations = imbalance_results['correlations']
+    correlation = correlations.get(best_horizon, correlations.get(str(best_horizon)))
 
     imbalance, pct_returns = df['imbalance_5'], returns * 100 
 
     # First plot
-    ax1.scatter(imbalance, pct_returns)
+    valid_mask = imbalance.notna() & pct_returns.notna()
+    imbalance_clean = imbalance[valid_mask].to_numpy()
+    returns_clean = pct_returns[valid_mask].to_numpy()
+
+    cached['scatter'].set_offsets(np.column_stack([imbalance_clean, returns_clean]))
     ax1.set_title(f'Imbalance vs Percentage Returns at Best Horizon ({best_horizon})')
-    ax1.set_xlabel('Imbalance')
-    ax1.set_ylabel('Returns (%)')
 
-    # Fit a linear model
-    valid_mask = imbalance.notna() & pct_returns.notna()
-    if valid_mask.sum() >= 2:
-        imbalance_clean = imbalance[valid_mask].to_numpy()
-        returns_clean = pct_returns[valid_mask].to_numpy()
-        coeffs = np.polyfit(imbalance_clean, returns_clean, 1)
+    # Least-squares line from the stored correlation: slope = r * sy / sx
+    sx = imbalance_clean.std() if len(imbalance_clean) >= 2 else 0.0
+    if sx > 0 and correlation is not None and np.isfinite(correlation):
+        slope = correlation * returns_clean.std() / sx
+        intercept = returns_clean.mean() - slope * imbalance_clean.mean()
     
         # Create smooth line for plotting
         imbalance_range = np.linspace(imbalance_clean.min(), imbalance_clean.max(), 200)
-        fitted_returns = np.polyval(coeffs, imbalance_range)
+        fitted_returns = slope * imbalance_range + intercept
         
-        correlation = imbalance_results['correlations'][str(best_horizon)]
-        ax1.plot(imbalance_range, fitted_returns, color='red', linewidth=2,
-                label=f'Correlation: {correlation:.3f}')
+        cached['fit_line'].set_data(imbalance_range, fitted_returns)
+        cached['fit_line'].set_label(f'Correlation: {correlation:.3f}')
         ax1.legend()
+    else:
+        cached['fit_line'].set_data([], [])
+        if ax1.get_legend() is not None:
+            ax1.get_legend().remove()
+
+    # Scatter x-range follows the data, y-range from percentiles
+    ax1.ignore_existing_data_limits = True
+    ax1.update_datalim(np.column_stack([imbalance_clean, returns_clean]))
+    ax1.autoscale_view(scaley=False)
 
-    # Get percentiles to set limits
-    y_lower = np.percentile(pct_returns.dropna(), 1)  # 1st percentile
-    y_upper = np.percentile(pct_returns.dropna(), 99)  # 99th percentile
+    # 1st and 99th percentiles from a single NaN drop and partition
+    y_lower, y_upper = np.percentile(pct_returns.dropna().to_numpy(), [1, 99])
     padding = (y_upper - y_lower) * 0.1
     ax1.set_ylim(y_lower - padding, y_upper + padding)
-    ax1.grid(True, alpha=0.3)
 
     # Second plot - Correlation decay
-    correlations = imbalance_results['correlations']
     horizons = list(map(int, correlations.keys()))  # Convert string keys to int
     corr_values = list(correlations.values())
 
     # Convert horizons to minutes for better interpretability
     horizons_minutes = [h * 20 / 60 for h in horizons]  # 20-second snapshots
 
-    ax2.plot(horizons_minutes, corr_values, 'o-', markersize=5, linewidth=2)
-    ax2.set_xlabel('Time Horizon (minutes)')
-    ax2.set_ylabel('Correlation')
-    ax2.set_title('Correlation Decay Over Time')
-    ax2.axhline(y=0, color='black', linestyle='--', alpha=0.3)  # Reference line at 0
-    ax2.set_ylim(-0.05, 0.2)  # Focus on relevant range
+    cached['decay_line'].set_data(horizons_minutes, corr_values)
+    ax2.relim()
+    ax2.autoscale_view(scaley=False)
 
     # Third Plot - Directional Accuracy
-    accuracies = imbalance_results['directional_accuracy']
-    thresholds = list(map(float, accuracies.keys()))
     accuracy_values = list(accuracies.values())
 
     # Convert to percentages
     accuracy_pct = [acc * 100 for acc in accuracy_values]
     
-    # Bar chart
-    bars = ax3.bar(range(len(thresholds)), accuracy_pct, tick_label=[f'{t:.1f}' for t in thresholds])
-    ax3.axhline(y=50, color='black', linestyle='--', alpha=0.5, label='Random (50%)')
-    ax3.set_xlabel('Imbalance Threshold')
-    ax3.set_ylabel('Directional Accuracy (%)')
-    ax3.set_title('Prediction Accuracy at Different Thresholds')
-    ax3.set_ylim(40, 60)  # Focus on relevant range around 50%
-    ax3.legend()
-    
+    ax3.set_xticks(range(len(thresholds)), labels=[f'{t:.1f}' for t in thresholds])
+
     # Colour bars based on whether they beat random
-    for bar, acc in zip(bars, accuracy_pct):
+    for bar, acc in zip(cached['bars'], accuracy_pct):
+        bar.set_height(acc)
         bar.set_color('green' if acc > 50 else 'red')
 
-    plt.tight_layout()
+    fig.canvas.draw_idle()
     
     if save_path:
-        plt.savefig(save_path, dpi=150, bbox_inches='tight')
+        fig.savefig(save_path, dpi=150, bbox_inches='tight')
     
     
     if show:
@@ -161,56 +227,76 @@ def plot_imbalance_analysis(df: pd.DataFrame, imbalance_results: Dict, save_path
     return fig
 
 
-def plot_variance_ratio_analysis(efficiency_results: Dict, save_path: Path = None, show: bool = True) -> plt.Figure:
+def _build_variance_ratio_figure(n_lags: int) -> dict:
+    """
+    Create the variance ratio figure with static decorations and empty artists
+    """
+    fig, ax = plt.subplots(figsize=(10, 6))
+
+    bars = ax.bar(range(n_lags), np.zeros(n_lags))
+
+    # Reference line at VR=1 (random walk)
+    ax.axhline(y=1.0, color='black', linestyle='--', linewidth=2, alpha=0.5, label='Random Walk (VR=1)')
+
+    # Labels and formatting
+    ax.set_xlabel('Lag (periods)')
+    ax.set_ylabel('Variance Ratio')
+    ax.set_title('Market Efficiency Test: Variance Ratios')
+    ax.set_ylim(0.5, 1.2)  # Focus on relevant range
+    ax.legend()
+
+    # Text with interpretation, filled in on each plot
+    text = ax.text(0.02, 0.98, '', transform=ax.transAxes, verticalalignment='top',
+                   bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
+
+    plt.tight_layout()
+
+    return {'fig': fig, 'ax': ax, 'bars': bars, 'text': text}
+
+
+def plot_variance_ratio_analysis(efficiency_results: Dict, save_path: Path = None, show: bool = True, rebuild: bool = False) -> plt.Figure:
     """
     Visualise variance ratio test results
     
+    The figure is built once and cached; later calls only update the
+    bar heights and annotation.
+
     Parameters:
     efficiency_results : Dict
         Results from test_market_efficiency() containing variance_ratios
     save_path : Path, optional
         If provided, saves figure to this location
+    rebuild : bool, default=False
+        Discard the cached figure and build a new one
         
     Returns:
     plt.Figure
         Bar chart showing variance ratios at different lags
     """
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
     # Extract data
     variance_ratios = efficiency_results['variance_ratios']
     lags = list(map(int, variance_ratios.keys()))
     vr_values = list(variance_ratios.values())
+
+    cached = _cached_figure('variance_ratio', _build_variance_ratio_figure, len(lags), rebuild)
+    fig, ax = cached['fig'], cached['ax']
     
-    # Create bar chart
-    bars = ax.bar(range(len(lags)), vr_values, tick_label=lags)
-    
-    # Reference line at VR=1 (random walk)
-    ax.axhline(y=1.0, color='black', linestyle='--', linewidth=2, alpha=0.5, label='Random Walk (VR=1)')
-    
+    ax.set_xticks(range(len(lags)), labels=lags)
+
     # Colour bars based on VR value
-    for bar, vr in zip(bars, vr_values):
+    for bar, vr in zip(cached['bars'], vr_values):
+        bar.set_height(vr)
         if vr < 1:
             bar.set_color('red')  # Mean reverting
         else:
             bar.set_color('green')  # Trending
     
-    # Labels and formatting
-    ax.set_xlabel('Lag (periods)')
-    ax.set_ylabel('Variance Ratio')
-    ax.set_title('Market Efficiency Test: Variance Ratios')
-    ax.set_ylim(0.5, 1.2)  # Focus on relevant range
-    ax.legend()
-    
-    # Add text with interpretation
-    ax.text(0.02, 0.98, f"Avg VR: {efficiency_results['average_vr']:.3f}\n{efficiency_results['market_characterization']}", 
-            transform=ax.transAxes, verticalalignment='top',
-            bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
+    cached['text'].set_text(f"Avg VR: {efficiency_results['average_vr']:.3f}\n{efficiency_results['market_characterization']}")
     
-    plt.tight_layout()
+    fig.canvas.draw_idle()
     
     if save_path:
-        plt.savefig(save_path, dpi=150, bbox_inches='tight')
+        fig.savefig(save_path, dpi=150, bbox_inches='tight')
     
     if show:
         plt.show()
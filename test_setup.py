@@ -76,7 +76,7 @@ def main():
     print(f"\nPython version: {sys.version}")
     
     # Required packages
-    required_packages = ['ccxt', 'pandas', 'numpy', 'matplotlib']
+    required_packages = ['ccxt', 'pandas', 'numpy', 'numba', 'pyarrow', 'matplotlib']
     package_status = {}
     
     print("\nPackage Status:")